@@ -1,13 +1,17 @@
 import os
 import random
+import pickle
 import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
 import numpy as np
 import logging
+from numba import njit, prange
 from sklearn.ensemble import RandomForestClassifier
 from sklearn.metrics import classification_report, accuracy_score, f1_score, precision_score, recall_score, confusion_matrix, roc_curve, auc, brier_score_loss, precision_recall_curve, roc_auc_score, average_precision_score
 from sklearn.inspection import permutation_importance
 from sklearn.calibration import calibration_curve
-from joblib import dump, load
+from joblib import dump, load, Parallel, delayed, Memory
 import argparse
 from imblearn.over_sampling import RandomOverSampler
 
@@ -15,12 +19,20 @@ import time
 
 from tqdm import tqdm
 from joblib import parallel_backend
-from contextlib import redirect_stdout, redirect_stderr
-import io
+import warnings
 from sklearn.metrics import precision_recall_curve
 from sklearn.model_selection import train_test_split
 import matplotlib.pyplot as plt
 
+try:
+    import treelite
+    import tl2cgen
+except ImportError:
+    treelite = None
+    tl2cgen = None
+
+pd.options.mode.string_storage = "pyarrow"
+
 ##logging file is called "Data\RFpredictions\__model_training.log"
 logging.basicConfig(filename='Data/RFpredictions/__model_training.log', level=logging.INFO, format='%(asctime)s - %(message)s')
 
@@ -29,6 +41,8 @@ argparser.add_argument("--runpercent", type=int, default=50, help="Percentage of
 argparser.add_argument("--clear", action='store_true', help="Flag to clear the model and data directories.")
 argparser.add_argument("--predict", action='store_true', help="Flag to predict new data.")
 argparser.add_argument("--reuse", action='store_true', help="Flag to reuse existing training data if available.")
+argparser.add_argument("--cache", action='store_true', help="Flag to cache preprocessed training files between runs.")
+argparser.add_argument("--bins", type=int, default=0, help="Number of quantile bins per feature, 0 trains on raw features.")
 argparser.add_argument("--feature_cut", type=float, default=0, help="Percentage of least important features to cut (0-100).")
 args = argparser.parse_args()
 
@@ -45,6 +59,9 @@ RUNNINGCONFIG = {
     "perm_feature_importance_output": "Data/ModelData/FeatureImportances/perm_feature_importance.parquet",
     "file_selection_percentage": args.runpercent,
     "target_column": "percent_change_Close",
+    "feature_bins": args.bins,
+    "cache_directory": "Data/ModelData/Cache",
+    "cache_bytes_limit": "4G",
 }
 
 RFCONFIG = {
@@ -60,12 +77,12 @@ RFCONFIG = {
     "bootstrap": True,
     "oob_score": True,  
     "random_state": 69,
-    "verbose": 2,
+    "verbose": 0,
     "n_jobs": -1,
     "warm_start": False,
     "class_weight": {0: 0.5, 1: 2.5},  
     "ccp_alpha": 0,  
-    "max_samples": None
+    "max_samples": 0.3
 }
 
 
@@ -80,72 +97,127 @@ def load_and_filter_features(config):
         logging.warning(f"Feature importance file not found: {feature_importance_path}")
         return None
     
-    df = pd.read_parquet(feature_importance_path)
+    importances = pq.read_table(feature_importance_path, columns=['feature', 'importance'])
+    feature_names = np.array(importances.column('feature').to_pylist(), dtype=str)
+    importance_values = importances.column('importance').to_numpy()
     
     # Remove essential columns from feature importance ranking
     essential_columns = ['Date', 'Open', 'High', 'Low', 'Close', 'Volume']
-    df_filtered = df[~df['feature'].isin(essential_columns)]
+    is_ranked = ~np.isin(feature_names, essential_columns)
+    features = feature_names[is_ranked]
     
-    df_sorted = df_filtered.sort_values('importance', ascending=False)
+    features_sorted = features[np.argsort(importance_values[is_ranked])[::-1]]
     
     if cut_percentage > 0:
-        n_keep = int(len(df_sorted) * (1 - cut_percentage / 100))
-        df_kept = df_sorted.head(n_keep)
-        logging.info(f"Keeping top {100 - cut_percentage}% of features: {n_keep} out of {len(df_sorted)} (excluding essential columns)")
+        n_keep = int(len(features_sorted) * (1 - cut_percentage / 100))
+        features_kept = features_sorted[:n_keep]
+        logging.info(f"Keeping top {100 - cut_percentage}% of features: {n_keep} out of {len(features_sorted)} (excluding essential columns)")
     else:
-        df_kept = df_sorted
-        logging.info(f"Using all {len(df_sorted)} features (excluding essential columns)")
+        features_kept = features_sorted
+        logging.info(f"Using all {len(features_sorted)} features (excluding essential columns)")
     
     # Add essential columns back to the list of features to keep
-    features_to_keep = df_kept['feature'].tolist() + essential_columns
+    features_to_keep = features_kept.tolist() + essential_columns
     
     return features_to_keep
 
 
-def prepare_training_data(input_directory, output_directory, file_selection_percentage, target_column, reuse, date_column, selected_features=None):
+# joblib.Memory only hashes _load_training_file's own source, so bump this when the mask logic changes
+TRAINING_ROW_MASK_VERSION = 1
+
+
+@njit(nogil=True, cache=True)
+def training_row_mask(target):
+    # Row i + 2 is kept when the next day's target is finite and within +/-10000
+    n_rows = target.size - 4
+    mask = np.empty(n_rows, dtype=np.bool_)
+    for i in range(n_rows):
+        value = target[i + 3]
+        mask[i] = not np.isnan(value) and -10000 <= value <= 10000
+    return mask
+
+
+def ensure_datetime(df, date_column):
+    # Parquet timestamps come back as datetime64 already, only string dates need parsing
+    if not pd.api.types.is_datetime64_any_dtype(df[date_column]):
+        df[date_column] = pd.to_datetime(df[date_column], cache=True)
+
+
+# mtime and mask_version are passed so they become part of the cache key under --cache,
+# so a rewritten file or a changed row mask is reprocessed
+def _load_training_file(file_path, mtime, mask_version, target_column, date_column, columns=None):
+    parquet_file = pq.ParquetFile(file_path)
+    schema_columns = parquet_file.schema_arrow.names
+    if target_column not in schema_columns or date_column not in schema_columns:
+        return None
+    if columns is not None:
+        wanted = set(columns)
+        columns = [col for col in schema_columns if col in wanted]
+    table = parquet_file.read(columns=columns)
+    n_rows = table.num_rows
+    if n_rows <= 50:
+        return None
+    # Shift the target back one row and trim two rows from each end
+    target_index = table.schema.get_field_index(target_column)
+    target = table.column(target_index).to_numpy().astype(np.float64, copy=False)
+    shifted_target = table.column(target_index).slice(3, n_rows - 4)
+    table = table.slice(2, n_rows - 4).set_column(target_index, target_column, shifted_target)
+    return table.filter(pa.array(training_row_mask(target)))
+
+
+def sample_parquet_paths(directory, file_selection_percentage):
+    # Each file is kept with the selection probability while streaming the directory, so no full listing is built
+    probability = file_selection_percentage / 100
+    return [entry.path for entry in os.scandir(directory) if entry.name.endswith('.parquet') and random.random() < probability]
+
+
+def prepare_training_data(input_directory, output_directory, file_selection_percentage, target_column, reuse, date_column, selected_features=None, use_cache=False):
     output_file = os.path.join(output_directory, 'training_data.parquet')
     if reuse and os.path.exists(output_file):
         logging.info("Reusing existing training data.")
         print("Reusing existing training data.")
-        return pd.read_parquet(output_file)
+        return pd.read_parquet(output_file, dtype_backend='pyarrow')
     
     logging.info("Preparing new training data.")
-    all_files = [f for f in os.listdir(input_directory) if f.endswith('.parquet')]
-    selected_files = random.sample(all_files, int(len(all_files) * file_selection_percentage / 100))
+    selected_paths = sample_parquet_paths(input_directory, file_selection_percentage)
     
     if os.path.exists(output_file):
         os.remove(output_file) 
-    pbar = tqdm(total=len(selected_files), desc="Processing files")
-    
-    all_data = []
-    
-    for file in selected_files:
-        df = pd.read_parquet(os.path.join(input_directory, file))
-        if df.shape[0] > 50 and target_column in df.columns and date_column in df.columns:
-            df[date_column] = pd.to_datetime(df[date_column])
-            df[target_column] = df[target_column].shift(-1)
-            df = df.iloc[2:-2]
-            df = df.dropna(subset=[target_column])
-            df = df[(df[target_column] <= 10000) & (df[target_column] >= -10000)]
-            all_data.append(df)
-        pbar.update(1)
-    pbar.close()
-    combined_df = pd.concat(all_data)
-    grouped = combined_df.groupby(date_column)
-    shuffled_groups = [group.sample(frac=1).reset_index(drop=True) for _, group in grouped]
-
-
 
-    
-    final_df = pd.concat(shuffled_groups).reset_index(drop=True)
-    
     essential_columns = ['Date', 'Open', 'High', 'Low', 'Close', 'Volume', target_column]
     
+    # Only decode the columns that survive feature selection
+    columns = None
+    if selected_features:
+        columns = sorted(set(selected_features + essential_columns + [date_column]))
+
+    load_training_file = _load_training_file
+    if use_cache:
+        memory = Memory(RUNNINGCONFIG['cache_directory'], verbose=0)
+        load_training_file = memory.cache(_load_training_file)
+
+    # Parquet decoding releases the GIL, so threads overlap the per-file reads
+    results = Parallel(n_jobs=-1, prefer="threads", batch_size=8, return_as="generator")(
+        delayed(load_training_file)(path, os.path.getmtime(path), TRAINING_ROW_MASK_VERSION, target_column, date_column, columns)
+        for path in selected_paths
+    )
+    all_data = [table for table in tqdm(results, total=len(selected_paths), desc="Processing files") if table is not None]
+    if use_cache:
+        # Refreshed indicator files get new mtimes, so drop the least recently used entries left by older runs
+        memory.reduce_size(bytes_limit=RUNNINGCONFIG['cache_bytes_limit'])
+    combined_table = pa.concat_tables(all_data, promote_options="default")
+    del all_data
+    combined_df = combined_table.to_pandas(self_destruct=True, split_blocks=True, use_threads=True)
+    del combined_table
+    ensure_datetime(combined_df, date_column)
+
+    # Order rows by date with a random tie-breaker, which shuffles rows within each date in one gather
+    dates = combined_df[date_column].values
+    order = np.lexsort((np.random.rand(len(dates)), dates))
+    final_df = combined_df.take(order).reset_index(drop=True)
+    
     if selected_features:
-        features_to_keep = [col for col in selected_features if col in final_df.columns]
-        features_to_keep = list(set(features_to_keep + essential_columns))
-        final_df = final_df[features_to_keep]
-        logging.info(f"Kept {len(features_to_keep)} features after selection (including essential columns)")
+        logging.info(f"Kept {final_df.shape[1]} features after selection (including essential columns)")
     
 
 
@@ -164,22 +236,80 @@ def prepare_training_data(input_directory, output_directory, file_selection_perc
 
 
 
+def fit_bin_edges(X, n_bins, subsample=200_000):
+    # Edges come from a row sample, like KBinsDiscretizer's quantile strategy, ignoring NaN
+    if len(X) > subsample:
+        X = X[np.random.default_rng(3301).choice(len(X), subsample, replace=False)]
+    quantiles = np.linspace(0, 1, n_bins + 1)[1:-1]
+    return np.nanquantile(X, quantiles, axis=0).astype(np.float32)
+
+
+def apply_bin_edges(X, bin_edges):
+    # NaN stays NaN so the forest's missing-value handling still applies
+    X_binned = np.empty(X.shape, dtype=np.float32)
+    for j in range(X.shape[1]):
+        X_binned[:, j] = np.searchsorted(bin_edges[:, j], X[:, j], side='right')
+    X_binned[np.isnan(X)] = np.nan
+    return X_binned
+
+
+def get_bin_edges_path(model_path):
+    return os.path.splitext(model_path)[0] + '_bin_edges.npy'
+
+
+def get_compiled_model_path(model_path):
+    return os.path.splitext(model_path)[0] + ('.dll' if os.name == 'nt' else '.so')
+
+
+def export_compiled_forest(clf, model_path):
+    if treelite is None or tl2cgen is None:
+        logging.warning("treelite/tl2cgen not installed, predictions will fall back to sklearn.")
+        return
+    compiled_model_path = get_compiled_model_path(model_path)
+    try:
+        model = treelite.sklearn.import_model(clf)
+        tl2cgen.export_lib(model, toolchain='msvc' if os.name == 'nt' else 'gcc', libpath=compiled_model_path, params={'parallel_comp': os.cpu_count()})
+        logging.info(f"Compiled model saved to {compiled_model_path}")
+    except Exception as e:
+        logging.error(f"Failed to compile model, predictions will fall back to sklearn: {str(e)}")
+
+
+def predict_up_probability(clf, X, predictor=None):
+    if predictor is None:
+        return clf.predict_proba(X)[:, 1]
+    # The compiled library routes NaN features differently from sklearn, so rows with NaN stay on predict_proba
+    has_nan = np.isnan(X).any(axis=1)
+    up_probability = np.empty(len(X), dtype=np.float64)
+    if has_nan.any():
+        up_probability[has_nan] = clf.predict_proba(X[has_nan])[:, 1]
+    X_complete = X[~has_nan]
+    if len(X_complete):
+        y_pred_proba = predictor.predict(tl2cgen.DMatrix(X_complete, dtype='float32'))
+        up_probability[~has_nan] = np.asarray(y_pred_proba).reshape(len(X_complete), -1)[:, -1]
+    return up_probability
+
+
 def train_precision_focused_random_forest(training_data, config, target_precision=0.70, prediction_percentage=0.05):
     logging.info("Training Precision-Focused Random Forest model with Random Over-Sampling.")
     
     model_output_path = os.path.join(config['model_output_directory'], 'random_forest_model.joblib')
-    if os.path.exists(model_output_path):
-        os.remove(model_output_path)
+    compiled_model_path = get_compiled_model_path(model_output_path)
+    bin_edges_path = get_bin_edges_path(model_output_path)
+    for path in (model_output_path, compiled_model_path, bin_edges_path):
+        if os.path.exists(path):
+            os.remove(path)
 
     # Remove any rows that have nan values
     training_data = training_data.dropna()
 
     X = training_data.drop(columns=[config['target_column']])
-    y = training_data[config['target_column']]
-    y = y.apply(lambda x: 1 if x > 0.0001 else 0)
+    y = (training_data[config['target_column']].to_numpy() > 0.0001).astype(np.uint8)
 
-    datetime_columns = X.select_dtypes(include=['datetime64']).columns
+    # select_dtypes does not match arrow-backed timestamps, so check each column's dtype
+    datetime_columns = [col for col in X.columns if pd.api.types.is_datetime64_any_dtype(X[col].dtype)]
     X = X.drop(columns=datetime_columns)
+    # The forest casts to float32 internally, so do it once here instead of per fit
+    X = X.astype(np.float32)
     
     X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=3301)
 
@@ -190,6 +320,14 @@ def train_precision_focused_random_forest(training_data, config, target_precisio
     logging.info(f"Original training set shape: {X_train.shape}")
     logging.info(f"Resampled training set shape: {X_train_resampled.shape}")
 
+    if config['feature_bins']:
+        # Quantile binning leaves at most feature_bins candidate thresholds per feature
+        bin_edges = fit_bin_edges(np.asarray(X_train_resampled), config['feature_bins'])
+        X_train_resampled = pd.DataFrame(apply_bin_edges(np.asarray(X_train_resampled), bin_edges), columns=X.columns)
+        X_test = pd.DataFrame(apply_bin_edges(np.asarray(X_test), bin_edges), columns=X.columns)
+        np.save(bin_edges_path, bin_edges)
+        logging.info(f"Binned features into {config['feature_bins']} quantile bins, edges saved to {bin_edges_path}")
+
     clf = RandomForestClassifier(**RFCONFIG)
     clf.fit(X_train_resampled, y_train_resampled)
     
@@ -206,7 +344,7 @@ def train_precision_focused_random_forest(training_data, config, target_precisio
     logging.info(f"Optimal threshold for {target_precision:.2f} precision: {optimal_threshold:.4f}")
     logging.info(f"Adjusted threshold for {prediction_percentage:.2%} predictions: {final_threshold:.4f}")
     
-    y_pred = (y_scores >= final_threshold).astype(int)
+    y_pred = (y_scores >= final_threshold).astype(np.int8)
     
     # Calculate metrics
     accuracy = accuracy_score(y_test, y_pred)
@@ -286,19 +424,17 @@ def train_precision_focused_random_forest(training_data, config, target_precisio
     logging.info(f"Brier Score: {brier_score:.4f}")
 
     # Feature importance analysis
-    feature_importances = pd.DataFrame({
-        'feature': X_train.columns,
-        'importance': clf.feature_importances_
-    }).sort_values(by='importance', ascending=False)
-    
-    feature_importances['importance'] = feature_importances['importance'].round(4)
+    feature_names = np.array(X_train.columns.tolist(), dtype=str)
+    importances = clf.feature_importances_.astype(np.float32)
+    ranking = np.argsort(importances)[::-1]
     
     logging.info("\nTop 10 Most Important Features:")
-    print(feature_importances.head(50))
+    for index in ranking[:50]:
+        print(f"{feature_names[index]}: {importances[index]:.4f}")
     
     # Plot feature importances
     plt.figure(figsize=(12, 6))
-    plt.bar(feature_importances['feature'][:20], feature_importances['importance'][:20])
+    plt.bar(feature_names[ranking[:20]], importances[ranking[:20]])
     plt.xticks(rotation=90)
     plt.title('Top 20 Feature Importances')
     plt.tight_layout()
@@ -306,8 +442,9 @@ def train_precision_focused_random_forest(training_data, config, target_precisio
     plt.close()
     
     # Save outputs
-    dump(clf, model_output_path)
+    dump(clf, model_output_path, compress=0, protocol=pickle.HIGHEST_PROTOCOL)
     logging.info(f"Model saved to {model_output_path}")
+    export_compiled_forest(clf, model_output_path)
     
     threshold_path = os.path.join(config['model_output_directory'], 'prediction_threshold.txt')
     with open(threshold_path, 'w') as f:
@@ -315,7 +452,7 @@ def train_precision_focused_random_forest(training_data, config, target_precisio
     logging.info(f"Prediction threshold saved to {threshold_path}")
     
     feature_importance_output_path = os.path.join(config['feature_importance_output'])
-    feature_importances.to_parquet(feature_importance_output_path, index=False)
+    pq.write_table(pa.Table.from_pydict({'feature': feature_names.tolist(), 'importance': importances}), feature_importance_output_path)
 
     return clf, final_threshold
 
@@ -323,6 +460,30 @@ def train_precision_focused_random_forest(training_data, config, target_precisio
 
 
 
+@njit(parallel=True, cache=True)
+def threshold_predictions(probabilities, threshold, out):
+    for i in prange(probabilities.size):
+        out[i] = 1 if probabilities[i] >= threshold else 0
+
+
+def _save_predictions(df, up_prediction, up_probability, present_optional, output_file_path):
+    df = df.assign(UpPrediction=up_prediction, UpProbability=up_probability)
+    
+    # Keep only necessary columns
+    columns_to_keep = ['Date', 'Open', 'High', 'Low', 'Close', 'Volume', 'UpPrediction', 'UpProbability'] + present_optional
+    df = df[columns_to_keep].round(5)
+    
+    # Convert numeric columns to float32
+    float_columns = ['Open', 'High', 'Low', 'Close', 'UpProbability'] + present_optional
+    
+    df[float_columns] = df[float_columns].astype(np.float32)
+    df['Volume'] = df['Volume'].astype(np.int32)
+    # Frames are read with the pyarrow backend, but the brokers expect a numpy datetime64 Date
+    df['Date'] = df['Date'].astype('datetime64[ns]')
+
+    pq.write_table(pa.Table.from_pandas(df, preserve_index=False), output_file_path)
+
+
 def predict_and_save(input_directory, model_path, output_directory, target_column, date_column, confidence_threshold_pos, selected_features=None):
     logging.info("Loading the trained model.")
     
@@ -331,63 +492,67 @@ def predict_and_save(input_directory, model_path, output_directory, target_colum
             os.remove(os.path.join(output_directory, file))
     
     clf = load(model_path)
+    # Models saved with verbose=2 would otherwise print per-tree progress from every worker
+    clf.verbose = 0
     
     model_features = clf.feature_names_in_
     
-    all_files = [f for f in os.listdir(input_directory) if f.endswith('.parquet')]
-    
-    pbar = tqdm(total=len(all_files), desc="Processing files", ncols=100)
-    
-    joblib_logger = logging.getLogger('joblib')
-    joblib_logger.setLevel(logging.ERROR)  
+    predictor = None
+    compiled_model_path = get_compiled_model_path(model_path)
+    if tl2cgen is not None and os.path.exists(compiled_model_path):
+        predictor = tl2cgen.Predictor(compiled_model_path, nthread=os.cpu_count())
+        logging.info(f"Using compiled model {compiled_model_path}")
     
-    null_io = io.StringIO()
+    all_files = [f for f in os.listdir(input_directory) if f.endswith('.parquet')]
     
-    for file in all_files:
-        df = pd.read_parquet(os.path.join(input_directory, file))
-        df[date_column] = pd.to_datetime(df[date_column])
+    if not all_files:
+        logging.warning(f"No parquet files found in {input_directory}")
+        return
+    
+    optional_columns = ["Distance to Support (%)", "Distance to Resistance (%)", "percent_change_Close"]
+    
+    # Indicator files share one schema, so resolve the columns to read from the first file only
+    schema_columns = pq.read_schema(os.path.join(input_directory, all_files[0])).names
+    present_optional = [col for col in optional_columns if col in schema_columns]
+    output_columns = ['Date', 'Open', 'High', 'Low', 'Close', 'Volume'] + present_optional
+    read_columns = list(dict.fromkeys(output_columns + list(model_features)))
+    
+    # Read every file first so all rows are scored by a single predict_proba call
+    frames = []
+    feature_blocks = []
+    offsets = [0]
+    for file in tqdm(all_files, desc="Loading files", ncols=100):
+        df = pd.read_parquet(os.path.join(input_directory, file), columns=read_columns, dtype_backend='pyarrow')
+        ensure_datetime(df, date_column)
         
         # Ensure we only use features that were present during training
-        X = df[model_features]
-        
-        with parallel_backend('threading', n_jobs=-1):
-            with redirect_stdout(null_io), redirect_stderr(null_io):
-                y_pred_proba = clf.predict_proba(X)
-        
-        df['UpProbability'] = y_pred_proba[:, 1]
-        df['UpPrediction'] = (df['UpProbability'] >= confidence_threshold_pos).astype(int)
-        
-        # Keep only necessary columns
-        columns_to_keep = ['Date', 'Open', 'High', 'Low', 'Close', 'Volume', 'UpPrediction', 'UpProbability']
-        if "Distance to Support (%)" in df.columns:
-            columns_to_keep.append("Distance to Support (%)")
-        if "Distance to Resistance (%)" in df.columns:
-            columns_to_keep.append("Distance to Resistance (%)")
-        if "percent_change_Close" in df.columns:
-            columns_to_keep.append("percent_change_Close")
-        
-        df = df[columns_to_keep]
-        df = df.round(5)
-        
-        # Convert numeric columns to float32
-        float_columns = ['Open', 'High', 'Low', 'Close', 'UpProbability']
-        if "Distance to Support (%)" in df.columns:
-            float_columns.append("Distance to Support (%)")
-        if "Distance to Resistance (%)" in df.columns:
-            float_columns.append("Distance to Resistance (%)")
-        if "percent_change_Close" in df.columns:
-            float_columns.append("percent_change_Close")
-        
-        df[float_columns] = df[float_columns].astype(np.float32)
-        df['UpPrediction'] = df['UpPrediction'].astype(np.int32)
-        df['Volume'] = df['Volume'].astype(np.int32)
-
-        output_file_path = os.path.join(output_directory, file)
-        df.to_parquet(output_file_path, index=False)
-        
-        pbar.update(1)
+        feature_blocks.append(df[model_features].to_numpy(dtype=np.float32, na_value=np.nan))
+        offsets.append(offsets[-1] + len(df))
+        frames.append(df[output_columns])
+    
+    X = np.vstack(feature_blocks)
+    del feature_blocks
+    
+    bin_edges_path = get_bin_edges_path(model_path)
+    if os.path.exists(bin_edges_path):
+        X = apply_bin_edges(X, np.load(bin_edges_path))
+    
+    with parallel_backend('threading', n_jobs=-1):
+        with warnings.catch_warnings():
+            # Features are passed as a float32 array in feature_names_in_ order
+            warnings.filterwarnings("ignore", message="X does not have valid feature names")
+            up_probability = predict_up_probability(clf, X, predictor)
+    up_prediction = np.empty(len(up_probability), dtype=np.int8)
+    threshold_predictions(up_probability, confidence_threshold_pos, up_prediction)
+    
+    # Parquet encoding releases the GIL, so threads overlap the per-ticker writes
+    results = Parallel(n_jobs=-1, prefer="threads", batch_size=8, return_as="generator")(
+        delayed(_save_predictions)(df, up_prediction[start:end], up_probability[start:end], present_optional, os.path.join(output_directory, file))
+        for file, df, start, end in zip(all_files, frames, offsets[:-1], offsets[1:])
+    )
+    for _ in tqdm(results, total=len(all_files), desc="Saving predictions", ncols=100):
+        pass
     
-    pbar.close()
     logging.info(f"Predictions saved to {output_directory}")
 
 
@@ -406,7 +571,8 @@ def main():
             target_column=RUNNINGCONFIG['target_column'],
             reuse=args.reuse,
             date_column='Date',
-            selected_features=selected_features
+            selected_features=selected_features,
+            use_cache=args.cache
         )
         logging.info("Data preparation complete.")
         